@@ -0,0 +1,266 @@
+"""Memory benchmark of the dataset store against the csv/pandas flow.
+
+Starts `--processes` processes, standing in for the pipeline stages and
+workers, that each load the same dataset and read all of its columns
+while the others hold it too. Reports, summed over the processes and on
+top of the memory used once the modules are imported, the peak RSS, the
+RSS and the proportional set size (PSS), which counts the pages shared
+between processes once.
+
+It then runs the stages of `main()` that follow the data fetching, from
+the validation into the store to the gated drift report and the
+regression quality, with their worker processes, and reports the peak PSS
+summed over the pipeline process and its workers for several `n_workers`.
+The predictions are synthetic instead of calling the model endpoint.
+Linux only, as it reads the `smaps_rollup` files in `/proc`.
+
+Run with
+`PYTHONPATH=. poetry run python benchmarks/bench_dataset_store_memory.py`.
+"""
+
+import argparse
+import copy
+import datetime
+import multiprocessing
+import resource
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from src.dataset_store import read_dataset, write_column, write_dataset
+from src.drift_report import generate_gated_report
+from src.inference import load_data, schema
+from src.regression_quality import generate_regression_quality
+from src.utils import load_yaml_config
+
+
+def make_housing_data(n_rows, seed=0):
+    """Synthetic data following the housing data schema."""
+    rng = np.random.default_rng(seed)
+    yes_no = ["yes", "no"]
+    return pd.DataFrame(
+        {
+            "price": rng.normal(4.7e6, 1.8e6, n_rows),
+            "area": rng.normal(5150, 2170, n_rows),
+            "bedrooms": rng.integers(1, 7, n_rows),
+            "bathrooms": rng.integers(1, 5, n_rows),
+            "stories": rng.integers(1, 5, n_rows),
+            "mainroad": rng.choice(yes_no, n_rows),
+            "guestroom": rng.choice(yes_no, n_rows),
+            "basement": rng.choice(yes_no, n_rows),
+            "hotwaterheating": rng.choice(yes_no, n_rows),
+            "airconditioning": rng.choice(yes_no, n_rows),
+            "parking": rng.integers(0, 4, n_rows),
+            "prefarea": rng.choice(yes_no, n_rows),
+            "furnishingstatus": rng.choice(
+                ["furnished", "semi-furnished", "unfurnished"], n_rows
+            ),
+        }
+    )
+
+
+def _memory_kb(pid="self"):
+    """Current RSS and PSS of a process in kB."""
+    memory = {}
+    with open(f"/proc/{pid}/smaps_rollup") as smaps:
+        for line in smaps:
+            name, _, value = line.partition(":")
+            if name in ("Rss", "Pss"):
+                memory[name.lower()] = int(value.split()[0])
+    return memory
+
+
+def _load(mode, path, barrier, results):
+    """Load the dataset and read every column, as a stage would."""
+    baseline = _memory_kb()
+    if mode == "csv":
+        data = schema.validate(pd.read_csv(path))
+    else:
+        data = read_dataset(path)
+    for column in data.columns:
+        # Touch the data so that lazily mapped pages are loaded too
+        series = data[column]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            series.array.codes.sum()
+        elif pd.api.types.is_numeric_dtype(series):
+            series.to_numpy().sum()
+        else:
+            series.str.len().sum()
+    # Measure while every process holds the data
+    barrier.wait()
+    memory = {
+        name: value - baseline[name] for name, value in _memory_kb().items()
+    }
+    memory["peak_rss"] = (
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - baseline["rss"]
+    )
+    results.put(memory)
+    barrier.wait()
+
+
+def _prepare(n_rows, csv_path, store_path, new_csv_path):
+    """Write the csv data and validate it once into the store."""
+    make_housing_data(n_rows).to_csv(csv_path, index=False)
+    write_dataset(schema.validate(pd.read_csv(csv_path)), store_path)
+    make_housing_data(n_rows, seed=1).to_csv(new_csv_path, index=False)
+
+
+def run(mode, path, n_processes):
+    """Total memory of `n_processes` processes loading the dataset."""
+    context = multiprocessing.get_context("spawn")
+    barrier = context.Barrier(n_processes)
+    results = context.Queue()
+    processes = [
+        context.Process(target=_load, args=(mode, path, barrier, results))
+        for _ in range(n_processes)
+    ]
+    for process in processes:
+        process.start()
+    memory = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    return {
+        name: sum(m[name] for m in memory) / 1024
+        for name in ["peak_rss", "rss", "pss"]
+    }
+
+
+def _descendants(pid):
+    """Ids of the child processes of a process, recursively."""
+    children = []
+    for task in Path(f"/proc/{pid}/task").glob("*"):
+        try:
+            children += (task / "children").read_text().split()
+        except OSError:
+            continue
+    return children + [d for c in children for d in _descendants(c)]
+
+
+def _total_pss_kb(pid):
+    """PSS summed over a process and its descendants, in kB."""
+    total = 0
+    for process_id in [pid] + _descendants(pid):
+        try:
+            total += _memory_kb(process_id)["pss"]
+        except (OSError, KeyError):
+            # The process has exited in the meantime
+            continue
+    return total
+
+
+def _pipeline(csv_paths, tmp_dir, n_workers, ready, start, results):
+    """Stages of `main()` after the data fetching, as run by `main()`."""
+    # Spawned processes start their own ones with spawn too, go back to the
+    # platform default that the worker pools of `main()` use
+    multiprocessing.set_start_method(None, force=True)
+    tmp_dir = Path(tmp_dir)
+    config = copy.deepcopy(load_yaml_config())
+    store_paths = (tmp_dir / "historical", tmp_dir / "new")
+    config["drift_screening"].update(
+        {
+            "n_workers": n_workers,
+            "save_path": tmp_dir / "screening.json",
+            # Keep the full evidently report out of the measurement
+            "psi_threshold": float("inf"),
+            "ks_alpha": 1e-300,
+        }
+    )
+    config["regression_quality"].update(
+        {"n_workers": n_workers, "save_path": tmp_dir / "quality.json"}
+    )
+    rng = np.random.default_rng(0)
+    ready.set()
+    start.wait()
+
+    started = time.perf_counter()
+    historical_data, current_data = load_data(*csv_paths, config)
+    write_dataset(historical_data, store_paths[0])
+    write_dataset(current_data, store_paths[1])
+    historical_data = read_dataset(store_paths[0])
+    current_data = read_dataset(store_paths[1])
+    for data, store_path in zip([historical_data, current_data], store_paths):
+        data["prediction"] = data["target"] * rng.normal(1, 0.1, len(data))
+        write_column(store_path, "prediction", data["prediction"])
+    generate_gated_report(
+        historical_data,
+        current_data,
+        tmp_dir / "report.html",
+        config,
+        datetime.datetime.now(),
+        store_paths=store_paths,
+    )
+    generate_regression_quality(
+        historical_data, current_data, config, store_paths[1]
+    )
+    results.put(time.perf_counter() - started)
+
+
+def run_pipeline(csv_paths, n_workers):
+    """Peak PSS of the pipeline process and its workers, in MB."""
+    context = multiprocessing.get_context("spawn")
+    ready, start, results = context.Event(), context.Event(), context.Queue()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        process = context.Process(
+            target=_pipeline,
+            args=(csv_paths, tmp_dir, n_workers, ready, start, results),
+        )
+        process.start()
+        ready.wait()
+        baseline = _total_pss_kb(process.pid)
+        peak = baseline
+        start.set()
+        while results.empty():
+            if not process.is_alive():
+                raise RuntimeError("The pipeline process failed")
+            peak = max(peak, _total_pss_kb(process.pid))
+            time.sleep(0.01)
+        duration = results.get()
+        process.join()
+    return {"peak_pss": (peak - baseline) / 1024, "time": duration}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--processes", type=int, default=3)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        csv_path = Path(tmp_dir) / "data.csv"
+        store_path = Path(tmp_dir) / "store"
+        new_csv_path = Path(tmp_dir) / "new_data.csv"
+
+        # The data is prepared in its own process, as the peak RSS of this
+        # process would otherwise be inherited by the ones it starts
+        process = multiprocessing.get_context("spawn").Process(
+            target=_prepare,
+            args=(args.rows, csv_path, store_path, new_csv_path),
+        )
+        process.start()
+        process.join()
+
+        csv_size = csv_path.stat().st_size / 2**20
+        print(
+            f"rows={args.rows} processes={args.processes} "
+            f"csv_size={csv_size:.1f}MB"
+        )
+        for mode, path in [("csv", csv_path), ("store", store_path)]:
+            memory = run(mode, path, args.processes)
+            print(
+                f"{mode:<6}"
+                f"total_peak_rss={memory['peak_rss']:.1f}MB "
+                f"total_rss={memory['rss']:.1f}MB "
+                f"total_pss={memory['pss']:.1f}MB"
+            )
+
+        for n_workers in args.workers:
+            memory = run_pipeline((csv_path, new_csv_path), n_workers)
+            print(
+                f"pipeline workers={n_workers} "
+                f"total_peak_pss={memory['peak_pss']:.1f}MB "
+                f"time={memory['time']:.1f}s"
+            )
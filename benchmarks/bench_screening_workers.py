@@ -0,0 +1,68 @@
+"""Scaling benchmark of the drift screening across worker processes.
+
+Run with `poetry run python benchmarks/bench_screening_workers.py`.
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from src.dataset_store import write_dataset
+from src.drift_screening import screen_stored_drift
+
+
+def make_wide_data(n_rows, n_columns, shift, seed):
+    """Wide synthetic data with numerical and one-hot like columns."""
+    rng = np.random.default_rng(seed)
+    n_numerical = n_columns // 2
+    data = {
+        f"num_{i}": rng.normal(shift, 1, n_rows) for i in range(n_numerical)
+    }
+    data.update(
+        {
+            f"cat_{i}": rng.choice(["yes", "no"], n_rows)
+            for i in range(n_columns - n_numerical)
+        }
+    )
+    return pd.DataFrame(data)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--columns", type=int, default=512)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        historical_store_path = Path(tmp_dir) / "historical"
+        new_store_path = Path(tmp_dir) / "new"
+        write_dataset(
+            make_wide_data(args.rows, args.columns, 0, seed=0),
+            historical_store_path,
+        )
+        write_dataset(
+            make_wide_data(args.rows, args.columns, 0.05, seed=1),
+            new_store_path,
+        )
+
+        print(f"rows={args.rows} columns={args.columns}")
+        baseline = None
+        for n_workers in [1, 2, 4, 8]:
+            timings = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                screen_stored_drift(
+                    historical_store_path, new_store_path, n_workers=n_workers
+                )
+                timings.append(time.perf_counter() - start)
+            best = min(timings)
+            baseline = baseline or best
+            print(
+                f"workers={n_workers} time={best:.3f}s "
+                f"speedup={baseline / best:.2f}x"
+            )
@@ -0,0 +1,122 @@
+"""Memory mapped dataset store shared by the stages and worker processes.
+
+Each dataset is a directory with one `.npy` file per column and a
+`meta.json` describing the columns. Numerical columns are stored as they
+are, the other columns as categorical codes. Reading a dataset memory maps
+the column files, so every stage and process shares the same pages
+instead of parsing and copying its own version of the data.
+"""
+
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from src.utils import logger
+
+META_FILE = "meta.json"
+
+
+def _column_path(store_path, name):
+    """Path of the file holding a column."""
+    return Path(store_path) / f"{name}.npy"
+
+
+def load_meta(store_path):
+    """Load the description of a stored dataset."""
+    with open(Path(store_path) / META_FILE, "r") as meta_file:
+        return json.load(meta_file)
+
+
+def _save_meta(store_path, meta):
+    """Save the description of a stored dataset."""
+    # Written last and atomically so that readers never see a partial store
+    tmp_path = Path(store_path) / f"{META_FILE}.tmp"
+    with open(tmp_path, "w") as meta_file:
+        json.dump(meta, meta_file, indent=2)
+    os.replace(tmp_path, Path(store_path) / META_FILE)
+
+
+def _encode_column(series: pd.Series):
+    """Array to store for a column and its metadata."""
+    if pd.api.types.is_numeric_dtype(
+        series
+    ) and not pd.api.types.is_bool_dtype(series):
+        values = series.to_numpy()
+        if values.dtype == object:
+            values = series.to_numpy(dtype=float, na_value=np.nan)
+        return values, {"kind": "numerical", "dtype": str(values.dtype)}
+
+    categorical = series.astype(str).where(series.notna()).astype("category")
+    codes = categorical.cat.codes.to_numpy()
+    categories = categorical.cat.categories.tolist()
+    return codes, {"kind": "categorical", "categories": categories}
+
+
+def write_column(store_path, name, series: pd.Series) -> None:
+    """Add or replace a single column of a stored dataset."""
+    meta = load_meta(store_path)
+    if len(series) != meta["n_rows"]:
+        raise ValueError(
+            f"Column {name} has {len(series)} rows, "
+            f"expected {meta['n_rows']}"
+        )
+    values, column_meta = _encode_column(pd.Series(series))
+    np.save(_column_path(store_path, name), values)
+    meta["columns"][name] = column_meta
+    _save_meta(store_path, meta)
+
+
+def write_dataset(data: pd.DataFrame, store_path) -> None:
+    """Write a (validated) dataframe to the store, replacing any older one."""
+    store_path = Path(store_path)
+    store_path.mkdir(parents=True, exist_ok=True)
+    (store_path / META_FILE).unlink(missing_ok=True)
+    for old_file in store_path.glob("*.npy"):
+        old_file.unlink()
+
+    meta = {"n_rows": len(data), "columns": {}}
+    for name in data.columns:
+        values, column_meta = _encode_column(data[name])
+        np.save(_column_path(store_path, name), values)
+        meta["columns"][name] = column_meta
+    _save_meta(store_path, meta)
+    logger.info(f"Dataset with {len(data)} rows written to {store_path}")
+
+
+def open_column(store_path, name) -> np.ndarray:
+    """Read only memory mapped view of the stored values of a column.
+
+    Categorical columns are returned as their codes, -1 for missing.
+    """
+    return np.load(_column_path(store_path, name), mmap_mode="r")
+
+
+def read_column(store_path, name, column_meta):
+    """Stored values of a column backed by the memory map.
+
+    `column_meta` is the description of the column in the store metadata.
+    Categorical columns are returned as a pandas categorical.
+    """
+    # Plain ndarray view of the memory map, without copying the data
+    values = np.asarray(open_column(store_path, name))
+    if column_meta["kind"] == "categorical":
+        return pd.Categorical.from_codes(values, column_meta["categories"])
+    return values
+
+
+def read_dataset(store_path, columns=None) -> pd.DataFrame:
+    """Open a stored dataset as a dataframe backed by the memory maps.
+
+    The returned dataframe is read only, columns added to it are kept in
+    memory and not written to the store.
+    """
+    meta = load_meta(store_path)
+    columns = columns or list(meta["columns"])
+    data = {
+        name: read_column(store_path, name, meta["columns"][name])
+        for name in columns
+    }
+    return pd.DataFrame(data, columns=columns, copy=False)
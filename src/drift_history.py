@@ -0,0 +1,284 @@
+"""Indexed history of the drift results for fast trend queries."""
+
+import argparse
+import json
+import os
+import sqlite3
+from pathlib import Path
+
+from botocore.exceptions import ClientError
+
+from src.upload_report import get_s3_client
+from src.utils import load_yaml_config, logger
+
+HISTORY_OBJECT_NAME = "drift_history.sqlite"
+
+# Errors of a conditional write when the object has changed concurrently
+CONFLICT_ERROR_CODES = (
+    "PreconditionFailed",
+    "ConditionalRequestConflict",
+    "412",
+    "409",
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp TEXT NOT NULL,
+    fingerprint TEXT,
+    model_endpoint TEXT,
+    model_version TEXT,
+    historical_data_version TEXT,
+    new_data_version TEXT,
+    drift_detected INTEGER NOT NULL,
+    full_report INTEGER NOT NULL,
+    report_object TEXT,
+    timings TEXT
+);
+CREATE TABLE IF NOT EXISTS column_drift (
+    run_id INTEGER NOT NULL REFERENCES runs(run_id),
+    column_name TEXT NOT NULL,
+    column_type TEXT,
+    psi REAL,
+    ks_statistic REAL,
+    drift_detected INTEGER NOT NULL,
+    PRIMARY KEY (column_name, run_id)
+);
+CREATE INDEX IF NOT EXISTS runs_model_timestamp
+    ON runs (model_version, timestamp);
+"""
+
+
+def connect(history_path):
+    """Open the history database, creating the tables if needed."""
+    connection = sqlite3.connect(history_path)
+    connection.row_factory = sqlite3.Row
+    connection.executescript(SCHEMA)
+    return connection
+
+
+def record_run(history_path, manifest, screening, timings=None):
+    """Append the drift results of a run to the history.
+
+    Returns the id of the recorded run.
+    """
+    inputs = manifest["inputs"]
+    connection = connect(history_path)
+    try:
+        with connection:
+            cursor = connection.execute(
+                "INSERT INTO runs (timestamp, fingerprint, model_endpoint, "
+                "model_version, historical_data_version, new_data_version, "
+                "drift_detected, full_report, report_object, timings) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    screening["timestamp"],
+                    manifest["fingerprint"],
+                    inputs["model_endpoint"],
+                    inputs["model_version"],
+                    inputs["historical_data_version"],
+                    inputs["new_data_version"],
+                    screening["drift_detected"],
+                    screening["full_report"],
+                    manifest.get("report_object"),
+                    json.dumps(timings or {}),
+                ),
+            )
+            run_id = cursor.lastrowid
+            connection.executemany(
+                "INSERT INTO column_drift (run_id, column_name, column_type, "
+                "psi, ks_statistic, drift_detected) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        run_id,
+                        column,
+                        result["column_type"],
+                        result["psi"],
+                        result["ks_statistic"],
+                        result["drift_detected"],
+                    )
+                    for column, result in screening["columns"].items()
+                ],
+            )
+    finally:
+        connection.close()
+    return run_id
+
+
+def get_column_trend(history_path, column_name, model_version=None):
+    """Drift scores of a column over the runs, oldest first."""
+    query = (
+        "SELECT r.run_id, r.timestamp, r.model_version, "
+        "r.new_data_version, c.psi, c.ks_statistic, c.drift_detected "
+        "FROM column_drift c JOIN runs r ON r.run_id = c.run_id "
+        "WHERE c.column_name = ?"
+    )
+    params = [column_name]
+    if model_version is not None:
+        query += " AND r.model_version = ?"
+        params.append(model_version)
+    query += " ORDER BY r.timestamp"
+    connection = connect(history_path)
+    try:
+        return [dict(row) for row in connection.execute(query, params)]
+    finally:
+        connection.close()
+
+
+def get_drift_onset(history_path, column_name, model_version=None):
+    """Run from which a column has been drifting continuously.
+
+    Returns None if the column is not drifting in the latest run.
+    """
+    onset = None
+    for row in get_column_trend(history_path, column_name, model_version):
+        if not row["drift_detected"]:
+            onset = None
+        elif onset is None:
+            onset = row
+    return onset
+
+
+def get_runs(history_path, model_version=None):
+    """Summary of the recorded runs, oldest first."""
+    query = (
+        "SELECT r.run_id, r.timestamp, r.model_version, "
+        "r.historical_data_version, r.new_data_version, r.drift_detected, "
+        "r.full_report, r.report_object, r.timings, "
+        "COUNT(CASE WHEN c.drift_detected THEN 1 END) AS n_drifted_columns "
+        "FROM runs r LEFT JOIN column_drift c ON r.run_id = c.run_id"
+    )
+    params = []
+    if model_version is not None:
+        query += " WHERE r.model_version = ?"
+        params.append(model_version)
+    query += " GROUP BY r.run_id ORDER BY r.timestamp"
+    connection = connect(history_path)
+    try:
+        return [dict(row) for row in connection.execute(query, params)]
+    finally:
+        connection.close()
+
+
+def download_history(s3_client, bucket_name, history_path):
+    """Replace the local history with the one in the s3 bucket.
+
+    Any local history is removed when the bucket has none, so that a stale
+    one is never uploaded as the shared history.
+    Returns the ETag of the downloaded history, None if there is none.
+    """
+    try:
+        response = s3_client.get_object(
+            Bucket=bucket_name, Key=HISTORY_OBJECT_NAME
+        )
+    except ClientError as e:
+        if e.response["Error"]["Code"] not in ("NoSuchKey", "404"):
+            raise e
+        logger.info("No drift history in the bucket yet")
+        Path(history_path).unlink(missing_ok=True)
+        return None
+    with open(history_path, "wb") as history_file:
+        for chunk in response["Body"].iter_chunks():
+            history_file.write(chunk)
+    return response["ETag"]
+
+
+def upload_history(s3_client, bucket_name, history_path, etag=None):
+    """Upload the local history to the s3 bucket.
+
+    The upload only succeeds if the history in the bucket is still the one
+    with the given ETag, or if there is still none when `etag` is None.
+    """
+    condition = {"IfMatch": etag} if etag else {"IfNoneMatch": "*"}
+    with open(history_path, "rb") as history_file:
+        s3_client.put_object(
+            Bucket=bucket_name,
+            Key=HISTORY_OBJECT_NAME,
+            Body=history_file,
+            **condition,
+        )
+
+
+def append_to_history(
+    s3_client,
+    bucket_name,
+    history_path,
+    manifest,
+    screening,
+    timings=None,
+    max_attempts=5,
+):
+    """Record a run in the history shared through the s3 bucket.
+
+    The history is downloaded, appended to and uploaded back with a
+    conditional write. If another run updated the history in the meantime,
+    the upload is rejected and retried on top of the new history, so no
+    run is lost.
+    """
+    for attempt in range(1, max_attempts + 1):
+        etag = download_history(s3_client, bucket_name, history_path)
+        record_run(history_path, manifest, screening, timings)
+        try:
+            upload_history(s3_client, bucket_name, history_path, etag)
+            return
+        except ClientError as e:
+            code = e.response["Error"]["Code"]
+            if code not in CONFLICT_ERROR_CODES or attempt == max_attempts:
+                raise e
+            logger.info(
+                f"Drift history updated by another run, retrying "
+                f"({attempt}/{max_attempts})"
+            )
+
+
+def parse_args(args=None):
+    """Parse the command line arguments of the history queries."""
+    parser = argparse.ArgumentParser(description="Query the drift history.")
+    parser.add_argument(
+        "--sync",
+        action="store_true",
+        help="download the latest history from the bucket first",
+    )
+    # Shared by the subcommands so that the option can follow them
+    query_parser = argparse.ArgumentParser(add_help=False)
+    query_parser.add_argument("--model-version", help="only show this model")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser(
+        "runs", parents=[query_parser], help="list the recorded runs"
+    )
+    trend_parser = subparsers.add_parser(
+        "trend",
+        parents=[query_parser],
+        help="drift scores of a column over the runs",
+    )
+    trend_parser.add_argument("column")
+    onset_parser = subparsers.add_parser(
+        "onset",
+        parents=[query_parser],
+        help="run from which a column has been drifting",
+    )
+    onset_parser.add_argument("column")
+    return parser.parse_args(args)
+
+
+if __name__ == "__main__":
+    config = load_yaml_config()
+    history_path = Path(config["drift_history_path"]).resolve()
+    args = parse_args()
+
+    if args.sync:
+        bucket_name = os.getenv(
+            "DRIFT_REPORT_BUCKET", config["report_save_bucket"]
+        )
+        download_history(get_s3_client(), bucket_name, history_path)
+
+    if args.command == "runs":
+        result = get_runs(history_path, args.model_version)
+    elif args.command == "trend":
+        result = get_column_trend(
+            history_path, args.column, args.model_version
+        )
+    else:
+        result = get_drift_onset(history_path, args.column, args.model_version)
+    print(json.dumps(result, indent=2))
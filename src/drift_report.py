@@ -1,12 +1,22 @@
 """Target/model drift report generation using evidently."""
 
+import os
 from pathlib import Path
 
 import pandas as pd
 from evidently.metric_preset import DataDriftPreset
 from evidently.report import Report
 
-from src.utils import load_yaml_config
+from src.dataset_store import read_dataset
+from src.drift_screening import (
+    get_full_report_reason,
+    save_screening,
+    screen_drift,
+    screen_stored_drift,
+)
+from src.regression_quality import generate_regression_quality
+from src.upload_report import get_last_report_time, get_s3_client
+from src.utils import load_yaml_config, logger
 
 
 def generate_report(
@@ -25,16 +35,86 @@ def generate_report(
     report.save_html(str(report_save_path))
 
 
+def generate_gated_report(
+    historical_data: pd.DataFrame,
+    current_data: pd.DataFrame,
+    report_save_path,
+    config,
+    last_report_time=None,
+    store_paths=None,
+) -> dict:
+    """Screen for drift and generate the full report only when needed.
+
+    The screening result is always saved, with the decision on the full
+    report recorded in it. A stale report at `report_save_path` is removed
+    when the full report is skipped so that it is not uploaded again.
+    When the (historical, current) `store_paths` of the datasets in the
+    dataset store are given, the screening workers read them from there.
+    """
+    screening_config = config["drift_screening"]
+    screening_params = {
+        "psi_threshold": screening_config["psi_threshold"],
+        "ks_alpha": screening_config["ks_alpha"],
+        "n_bins": screening_config["n_bins"],
+    }
+    if store_paths is not None:
+        screening = screen_stored_drift(
+            *store_paths,
+            **screening_params,
+            n_workers=screening_config["n_workers"],
+        )
+    else:
+        screening = screen_drift(
+            historical_data, current_data, **screening_params
+        )
+
+    if screening_config["enabled"]:
+        reason = get_full_report_reason(
+            screening,
+            last_report_time,
+            screening_config["full_report_interval_days"],
+        )
+    else:
+        reason = "screening_disabled"
+
+    screening["full_report"] = reason is not None
+    screening["full_report_reason"] = reason
+
+    if reason is not None:
+        logger.info(f"Generating full drift report, reason: {reason}")
+        generate_report(historical_data, current_data, report_save_path)
+    else:
+        logger.info("No drift detected in screening, skipping full report")
+        Path(report_save_path).unlink(missing_ok=True)
+
+    save_screening(screening, screening_config["save_path"])
+    return screening
+
+
 if __name__ == "__main__":
     config = load_yaml_config()
 
-    historical_data_save_path = Path(
-        config["historical_data_save_path"]
+    historical_data_store_path = Path(
+        config["historical_data_store_path"]
     ).resolve()
-    new_data_save_path = Path(config["new_data_save_path"]).resolve()
+    new_data_store_path = Path(config["new_data_store_path"]).resolve()
     report_save_path = Path(config["report_save_path"]).resolve()
+    bucket_name = os.getenv(
+        "DRIFT_REPORT_BUCKET", config["report_save_bucket"]
+    )
 
-    historical_data = pd.read_csv(historical_data_save_path)
-    new_data = pd.read_csv(new_data_save_path)
+    historical_data = read_dataset(historical_data_store_path)
+    new_data = read_dataset(new_data_store_path)
 
-    generate_report(historical_data, new_data, report_save_path)
+    last_report_time = get_last_report_time(get_s3_client(), bucket_name)
+    generate_gated_report(
+        historical_data,
+        new_data,
+        report_save_path,
+        config,
+        last_report_time,
+        store_paths=(historical_data_store_path, new_data_store_path),
+    )
+    generate_regression_quality(
+        historical_data, new_data, config, new_data_store_path
+    )
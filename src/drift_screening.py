@@ -0,0 +1,351 @@
+"""Fast drift screening used to gate the full evidently report."""
+
+import datetime
+import json
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+import numpy as np
+import pandas as pd
+
+from src.dataset_store import load_meta, open_column, read_column
+
+# Floor for bin frequencies so that empty bins do not blow up the PSI
+EPSILON = 1e-6
+
+
+def _is_numerical(series: pd.Series) -> bool:
+    """Check whether a column should be screened as numerical."""
+    return pd.api.types.is_numeric_dtype(
+        series
+    ) and not pd.api.types.is_bool_dtype(series)
+
+
+def _psi(reference_freq: np.ndarray, current_freq: np.ndarray) -> float:
+    """Population stability index between two binned distributions."""
+    reference_freq = np.clip(reference_freq, EPSILON, None)
+    current_freq = np.clip(current_freq, EPSILON, None)
+    return float(
+        np.sum(
+            (current_freq - reference_freq)
+            * np.log(current_freq / reference_freq)
+        )
+    )
+
+
+def _categorical_frequencies(
+    reference: np.ndarray, current: np.ndarray, n_categories: int
+):
+    """Category frequencies of both columns from their category codes."""
+    reference_counts = np.bincount(
+        reference.astype(np.int64), minlength=n_categories
+    )
+    current_counts = np.bincount(
+        current.astype(np.int64), minlength=n_categories
+    )
+    return (
+        reference_counts / len(reference),
+        current_counts / len(current),
+    )
+
+
+def _numerical_frequencies(
+    reference: np.ndarray, current: np.ndarray, n_bins: int
+):
+    """Bin frequencies of both columns over reference quantile bins."""
+    edges = np.unique(np.quantile(reference, np.linspace(0, 1, n_bins + 1)))
+    # Only the inner edges are used so that values outside the reference
+    # range fall into the outermost bins
+    inner_edges = edges[1:-1]
+    n_buckets = len(inner_edges) + 1
+    reference_counts = np.bincount(
+        np.searchsorted(inner_edges, reference, side="right"),
+        minlength=n_buckets,
+    )
+    current_counts = np.bincount(
+        np.searchsorted(inner_edges, current, side="right"),
+        minlength=n_buckets,
+    )
+    return (
+        reference_counts / len(reference),
+        current_counts / len(current),
+    )
+
+
+def _ks_statistic(reference: np.ndarray, current: np.ndarray) -> float:
+    """Two sample Kolmogorov-Smirnov statistic."""
+    reference = np.sort(reference)
+    current = np.sort(current)
+    values = np.concatenate([reference, current])
+    reference_cdf = np.searchsorted(reference, values, side="right") / len(
+        reference
+    )
+    current_cdf = np.searchsorted(current, values, side="right") / len(current)
+    return float(np.max(np.abs(reference_cdf - current_cdf)))
+
+
+def _ks_critical_value(n_reference: int, n_current: int, alpha: float):
+    """Asymptotic critical value of the two sample KS statistic."""
+    c_alpha = np.sqrt(-np.log(alpha / 2) / 2)
+    return float(
+        c_alpha
+        * np.sqrt((n_reference + n_current) / (n_reference * n_current))
+    )
+
+
+def screen_column(
+    reference: np.ndarray,
+    current: np.ndarray,
+    n_categories: int | None = None,
+    psi_threshold: float = 0.1,
+    ks_alpha: float = 0.05,
+    n_bins: int = 10,
+) -> dict:
+    """Screen a single column for drift using PSI and the KS statistic.
+
+    Numerical columns are passed as values, categorical columns as the
+    category codes along with the number of categories.
+    """
+    reference = reference[~np.isnan(reference)]
+    current = current[~np.isnan(current)]
+    numerical = n_categories is None
+    result = {
+        "column_type": "num" if numerical else "cat",
+        "psi": None,
+        "ks_statistic": None,
+        "drift_detected": False,
+    }
+    if len(reference) == 0 or len(current) == 0:
+        return result
+
+    if numerical:
+        reference_freq, current_freq = _numerical_frequencies(
+            reference, current, n_bins
+        )
+        ks_statistic = _ks_statistic(reference, current)
+        ks_critical = _ks_critical_value(
+            len(reference), len(current), ks_alpha
+        )
+        result["ks_statistic"] = ks_statistic
+        result["drift_detected"] = ks_statistic > ks_critical
+    else:
+        reference_freq, current_freq = _categorical_frequencies(
+            reference, current, n_categories
+        )
+
+    result["psi"] = _psi(reference_freq, current_freq)
+    result["drift_detected"] = bool(
+        result["drift_detected"] or result["psi"] >= psi_threshold
+    )
+    return result
+
+
+def _encode_column_pair(reference: pd.Series, current: pd.Series):
+    """Values of a column of both datasets as float arrays.
+
+    Categorical columns are replaced by their codes over the union of the
+    categories of both datasets, missing values are NaN.
+    Returns both arrays and the number of categories, None for numerical
+    columns.
+    """
+    if _is_numerical(reference) and _is_numerical(current):
+        return (
+            reference.to_numpy(dtype=float, na_value=np.nan),
+            current.to_numpy(dtype=float, na_value=np.nan),
+            None,
+        )
+    values = pd.concat([reference, current], ignore_index=True)
+    codes, categories = pd.factorize(values.astype(str).where(values.notna()))
+    codes = np.where(codes < 0, np.nan, codes)
+    n_reference = len(reference)
+    return codes[:n_reference], codes[n_reference:], len(categories)
+
+
+def _codes_to_float(codes: np.ndarray, mapping: np.ndarray | None = None):
+    """Category codes as floats, optionally remapped, -1 becoming NaN."""
+    values = codes.astype(float)
+    values[codes < 0] = np.nan
+    if mapping is not None:
+        valid = codes >= 0
+        values[valid] = mapping[codes[valid]]
+    return values
+
+
+def _read_stored_column_pair(
+    reference_store, current_store, column, reference_meta, current_meta
+):
+    """Values of a column of both stored datasets, see `_encode_column_pair`.
+
+    The columns are opened from the memory mapped store and only the
+    column being screened is converted, the stored codes of categorical
+    columns being mapped to the union of the categories of both datasets.
+    `reference_meta` and `current_meta` describe the column in each store.
+    """
+    reference = open_column(reference_store, column)
+    current = open_column(current_store, column)
+    kinds = {reference_meta["kind"], current_meta["kind"]}
+    if kinds == {"numerical"}:
+        return (
+            np.asarray(reference, dtype=float),
+            np.asarray(current, dtype=float),
+            None,
+        )
+    if kinds != {"categorical"}:
+        # A column stored as numerical in one dataset only, rare enough to
+        # be encoded as pandas series
+        return _encode_column_pair(
+            pd.Series(read_column(reference_store, column, reference_meta)),
+            pd.Series(read_column(current_store, column, current_meta)),
+        )
+    union = {c: i for i, c in enumerate(reference_meta["categories"])}
+    for category in current_meta["categories"]:
+        union.setdefault(category, len(union))
+    mapping = np.array(
+        [union[c] for c in current_meta["categories"]], dtype=float
+    )
+    return (
+        _codes_to_float(reference),
+        _codes_to_float(current, mapping),
+        len(union),
+    )
+
+
+def _screen_stored_columns(
+    reference_store, current_store, column_metas, screening_params
+):
+    """Screen some columns of two stored datasets.
+
+    `column_metas` lists the name of each column with its description in
+    both stores. This runs in the worker processes, so only the store paths
+    and the column descriptions are sent to the workers, not the data.
+    """
+    return [
+        screen_column(
+            *_read_stored_column_pair(
+                reference_store, current_store, *column_meta
+            ),
+            **screening_params,
+        )
+        for column_meta in column_metas
+    ]
+
+
+def _summarise_screening(column_results: dict) -> dict:
+    """Screening result from the results of each column."""
+    drifted_columns = [
+        column
+        for column, result in column_results.items()
+        if result["drift_detected"]
+    ]
+    return {
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "drift_detected": len(drifted_columns) > 0,
+        "drifted_columns": drifted_columns,
+        "columns": column_results,
+    }
+
+
+def screen_drift(
+    historical_data: pd.DataFrame,
+    current_data: pd.DataFrame,
+    psi_threshold: float = 0.1,
+    ks_alpha: float = 0.05,
+    n_bins: int = 10,
+) -> dict:
+    """Screen all the shared columns of the two datasets for drift.
+
+    This is a cheap approximation of the evidently data drift preset, meant
+    to decide whether the full report is worth generating.
+    """
+    columns = [c for c in historical_data.columns if c in current_data]
+    column_results = {
+        column: screen_column(
+            *_encode_column_pair(
+                historical_data[column], current_data[column]
+            ),
+            psi_threshold=psi_threshold,
+            ks_alpha=ks_alpha,
+            n_bins=n_bins,
+        )
+        for column in columns
+    }
+    return _summarise_screening(column_results)
+
+
+def screen_stored_drift(
+    historical_store_path,
+    current_store_path,
+    psi_threshold: float = 0.1,
+    ks_alpha: float = 0.05,
+    n_bins: int = 10,
+    n_workers: int = 1,
+) -> dict:
+    """Screen all the shared columns of two stored datasets for drift.
+
+    Same as `screen_drift` for datasets in the dataset store. With
+    `n_workers` above 1, the columns are split across a process pool whose
+    workers open the columns from the store themselves.
+    """
+    # The metadata is loaded once, not for each column
+    reference_columns = load_meta(historical_store_path)["columns"]
+    current_columns = load_meta(current_store_path)["columns"]
+    column_metas = [
+        (column, column_meta, current_columns[column])
+        for column, column_meta in reference_columns.items()
+        if column in current_columns
+    ]
+    columns = [column for column, _, _ in column_metas]
+    screening_params = {
+        "psi_threshold": psi_threshold,
+        "ks_alpha": ks_alpha,
+        "n_bins": n_bins,
+    }
+    stores = (str(historical_store_path), str(current_store_path))
+    meta_chunks = [
+        [column_metas[i] for i in chunk]
+        for chunk in np.array_split(np.arange(len(column_metas)), n_workers)
+        if len(chunk) > 0
+    ]
+    if len(meta_chunks) > 1:
+        with ProcessPoolExecutor(max_workers=len(meta_chunks)) as executor:
+            chunk_results = executor.map(
+                _screen_stored_columns,
+                repeat(stores[0]),
+                repeat(stores[1]),
+                meta_chunks,
+                repeat(screening_params),
+            )
+            results = [result for chunk in chunk_results for result in chunk]
+    else:
+        results = _screen_stored_columns(
+            *stores, column_metas, screening_params
+        )
+    return _summarise_screening(dict(zip(columns, results)))
+
+
+def get_full_report_reason(
+    screening: dict,
+    last_report_time: datetime.datetime | None = None,
+    full_report_interval_days: float | None = None,
+) -> str | None:
+    """Decide whether the full report is needed.
+
+    Returns the reason for generating the full report, or None if it can
+    be skipped.
+    """
+    if screening["drift_detected"]:
+        return "drift_detected"
+    if full_report_interval_days is None:
+        return None
+    if last_report_time is None:
+        return "no_previous_report"
+    interval = datetime.timedelta(days=full_report_interval_days)
+    if datetime.datetime.now() - last_report_time >= interval:
+        return "periodic"
+    return None
+
+
+def save_screening(screening: dict, save_path) -> None:
+    """Save the screening result as a json file."""
+    with open(save_path, "w") as screening_file:
+        json.dump(screening, screening_file, indent=2)
@@ -4,6 +4,7 @@ import os
 import shutil
 from pathlib import Path
 
+import yaml
 from dvc.cli import main as dvc_main
 from git import Repo
 
@@ -143,6 +144,16 @@ def safe_move(src, dst):
     os.remove(src)
 
 
+def get_dvc_md5(dvc_file_path):
+    """Get the md5 of the data tracked by a `.dvc` file."""
+    if not os.path.exists(dvc_file_path):
+        logger.warning(f"DVC file {dvc_file_path} not found")
+        return None
+    with open(dvc_file_path, "r") as dvc_file:
+        dvc_meta = yaml.safe_load(dvc_file)
+    return dvc_meta["outs"][0]["md5"]
+
+
 def move_dvc_data(source_repo, save_path):
     """Move pulled dvc data to where it is expected to be."""
     # First delete if the destination has files with same name
@@ -160,7 +171,10 @@ def move_dvc_data(source_repo, save_path):
 
 
 def fetch_data(config, data_version, save_path):
-    """Fetch the versioned data from dvc."""
+    """Fetch the versioned data from dvc.
+
+    Returns the dvc md5 of the fetched data.
+    """
     # 1. Authenticate, clone, and update git repo
     data_repo = os.getenv("DATA_REPO", config["dvc"]["git_repo_url"])
 
@@ -178,6 +192,7 @@ def fetch_data(config, data_version, save_path):
     checkout_data(repo, data_version)
 
     # 4. DVC pull
+    dvc_md5 = get_dvc_md5("./artefacts/train_data.csv.dvc")
     dvc_pull(config)
 
     # 5. move the pulled data to expected location
@@ -185,6 +200,8 @@ def fetch_data(config, data_version, save_path):
     os.chdir("../")
     delete_directory_if_exists(repo_temp_path)
 
+    return dvc_md5
+
 
 if __name__ == "__main__":
     # load the config file
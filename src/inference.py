@@ -8,6 +8,7 @@ import pandas as pd
 import requests
 from pandera import Column, DataFrameSchema
 
+from src.dataset_store import read_dataset, write_column, write_dataset
 from src.utils import load_yaml_config
 
 headers = {"Content-Type": "application/json"}
@@ -46,6 +47,11 @@ def load_data(historical_data_path, new_data_path, config):
     current_data.rename(columns={label_column: "target"}, inplace=True)
     historical_data.rename(columns={label_column: "target"}, inplace=True)
 
+    # Float like the predictions, so that the target is stored as float and
+    # the regression quality workers read it without converting a copy
+    current_data["target"] = current_data["target"].astype(float)
+    historical_data["target"] = historical_data["target"].astype(float)
+
     return historical_data, current_data
 
 
@@ -108,17 +114,19 @@ if __name__ == "__main__":
         config["historical_data_save_path"]
     ).resolve()
     new_data_save_path = Path(config["new_data_save_path"]).resolve()
+    historical_data_store_path = Path(
+        config["historical_data_store_path"]
+    ).resolve()
+    new_data_store_path = Path(config["new_data_store_path"]).resolve()
 
-    # load the datasets
+    # load and validate the datasets once for all the following stages
     historical_data, new_data = load_data(
         historical_data_save_path, new_data_save_path, config
     )
+    write_dataset(historical_data, historical_data_store_path)
+    write_dataset(new_data, new_data_store_path)
 
     # Model predictions for both datasets, one record at a time
-    historical_data["prediction"] = predict(
-        model_endpoint, historical_data[feature_columns]
-    )
-    new_data["prediction"] = predict(model_endpoint, new_data[feature_columns])
-
-    historical_data.to_csv(historical_data_save_path, index=False)
-    new_data.to_csv(new_data_save_path, index=False)
+    for store_path in [historical_data_store_path, new_data_store_path]:
+        data = read_dataset(store_path, feature_columns)
+        write_column(store_path, "prediction", predict(model_endpoint, data))
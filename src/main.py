@@ -1,14 +1,25 @@
 """Main entrypoint for drift monitoring for bridgeai regression model data."""
 
 import os
+import time
 import warnings
 from pathlib import Path
 
-from src.drift_report import generate_report
+from botocore.exceptions import BotoCoreError, ClientError
+
+from src.dataset_store import read_dataset, write_column, write_dataset
+from src.drift_history import append_to_history
+from src.drift_report import generate_gated_report
 from src.get_data import fetch_data
 from src.inference import load_data, predict
-from src.upload_report import get_s3_client, upload
-from src.utils import load_yaml_config
+from src.regression_quality import generate_regression_quality
+from src.run_manifest import (
+    build_run_manifest,
+    find_previous_run,
+    save_run_manifest,
+)
+from src.upload_report import get_last_report_time, get_s3_client, upload
+from src.utils import load_yaml_config, logger
 
 warnings.filterwarnings("ignore")
 
@@ -26,40 +37,146 @@ def main():
     )
     feature_columns = config["feature_columns"]
     model_endpoint = os.getenv("MODEL_ENDPOINT", config["model_endpoint"])
+    model_version = os.getenv("MODEL_VERSION", config["model_version"])
+    data_repo = os.getenv("DATA_REPO", config["dvc"]["git_repo_url"])
+    force_run = os.getenv("FORCE_RUN", str(config["force_run"]))
     report_save_path = Path(config["report_save_path"]).resolve()
+    screening_save_path = Path(
+        config["drift_screening"]["save_path"]
+    ).resolve()
+    regression_quality_save_path = Path(
+        config["regression_quality"]["save_path"]
+    ).resolve()
+    run_manifest_path = Path(config["run_manifest_path"]).resolve()
+    drift_history_path = Path(config["drift_history_path"]).resolve()
 
     historical_data_save_path = Path(
         config["historical_data_save_path"]
     ).resolve()
     new_data_save_path = Path(config["new_data_save_path"]).resolve()
+    historical_data_store_path = Path(
+        config["historical_data_store_path"]
+    ).resolve()
+    new_data_store_path = Path(config["new_data_store_path"]).resolve()
 
     print(f"historical_data_save_path: {historical_data_save_path}")
     print(f"new_data_save_path: {new_data_save_path}")
 
+    bucket_name = os.getenv(
+        "DRIFT_REPORT_BUCKET", config["report_save_bucket"]
+    )
+    s3_client = get_s3_client()
+
+    # Skip the run if its inputs are the same as a previous successful run
+    manifest = build_run_manifest(
+        config,
+        data_repo,
+        historical_data_version,
+        new_data_version,
+        model_endpoint,
+        model_version,
+        bucket_name,
+    )
+    if force_run.lower() == "true":
+        logger.info("FORCE_RUN is set, not checking for previous runs")
+    else:
+        previous_run = find_previous_run(
+            manifest, run_manifest_path, s3_client, bucket_name
+        )
+        if previous_run is not None:
+            logger.info(
+                f"Skipping drift run, inputs unchanged since the run "
+                f"completed at {previous_run['completed_at']} "
+                f"(fingerprint {manifest['fingerprint']})"
+            )
+            return
+
+    # Time taken by each stage, recorded in the drift history
+    timings = {}
+
     # Fetch datasets from dvc
-    fetch_data(config, historical_data_version, historical_data_save_path)
-    fetch_data(config, new_data_version, new_data_save_path)
+    start = time.perf_counter()
+    manifest["dvc_md5"] = {
+        "historical_data": fetch_data(
+            config, historical_data_version, historical_data_save_path
+        ),
+        "new_data": fetch_data(config, new_data_version, new_data_save_path),
+    }
 
-    # load the datasets
+    # load the datasets, validated once into the memory mapped store
     historical_data, current_data = load_data(
         historical_data_save_path, new_data_save_path, config
     )
+    write_dataset(historical_data, historical_data_store_path)
+    write_dataset(current_data, new_data_store_path)
+    historical_data = read_dataset(historical_data_store_path)
+    current_data = read_dataset(new_data_store_path)
+
+    timings["fetch_data"] = time.perf_counter() - start
 
     # Model predictions for both datasets
+    start = time.perf_counter()
     historical_data["prediction"] = predict(
         model_endpoint, historical_data[feature_columns]
     )
     current_data["prediction"] = predict(
         model_endpoint, current_data[feature_columns]
     )
+    write_column(
+        historical_data_store_path, "prediction", historical_data["prediction"]
+    )
+    write_column(new_data_store_path, "prediction", current_data["prediction"])
 
-    generate_report(historical_data, current_data, report_save_path)
+    timings["predict"] = time.perf_counter() - start
 
-    bucket_name = os.getenv(
-        "DRIFT_REPORT_BUCKET", config["report_save_bucket"]
+    # Cheap drift screening, the full report is only generated when needed
+    start = time.perf_counter()
+    screening = generate_gated_report(
+        historical_data,
+        current_data,
+        report_save_path,
+        config,
+        get_last_report_time(s3_client, bucket_name),
+        store_paths=(historical_data_store_path, new_data_store_path),
     )
-    s3_client = get_s3_client()
-    upload(s3_client, report_save_path, bucket_name)
+    timings["drift_report"] = time.perf_counter() - start
+
+    # Model quality and prediction drift
+    start = time.perf_counter()
+    generate_regression_quality(
+        historical_data, current_data, config, new_data_store_path
+    )
+    timings["regression_quality"] = time.perf_counter() - start
+
+    manifest["screening_object"] = upload(
+        s3_client, screening_save_path, bucket_name, "screening"
+    )
+    manifest["regression_quality_object"] = upload(
+        s3_client,
+        regression_quality_save_path,
+        bucket_name,
+        "regression_quality",
+    )
+    if screening["full_report"]:
+        manifest["report_object"] = upload(
+            s3_client, report_save_path, bucket_name
+        )
+
+    # Append the results to the drift history kept in the bucket. The
+    # results are already uploaded, so a failed sync does not fail the run
+    try:
+        append_to_history(
+            s3_client,
+            bucket_name,
+            drift_history_path,
+            manifest,
+            screening,
+            timings,
+        )
+    except (BotoCoreError, ClientError) as e:
+        logger.error(f"Drift history could not be updated with error: {e}")
+
+    save_run_manifest(manifest, run_manifest_path, s3_client, bucket_name)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,332 @@
+"""Regression model quality and prediction drift computed with numpy."""
+
+import json
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+import numpy as np
+import pandas as pd
+
+from src.dataset_store import open_column
+from src.drift_screening import screen_column
+from src.utils import logger
+
+METRICS = ["mae", "rmse", "mape", "mean_error"]
+
+# Maximum number of resampled values (bootstrap samples x rows) held at
+# once over all the bootstrap workers, so that the memory of the bootstrap
+# does not grow with the data or the number of workers
+BOOTSTRAP_BATCH_ELEMENTS = 2_000_000
+
+
+def prediction_error(target, prediction):
+    """Errors of the predictions, positive when the model overestimates.
+
+    Used for both the mean error and the residuals, `prediction - target`.
+    """
+    return prediction - target
+
+
+def grouped_metrics(target, prediction, codes, n_groups):
+    """Regression metrics of every group in a single vectorised pass.
+
+    `codes` assigns each row to one of the `n_groups` groups.
+    Returns a dict of arrays with one value per group. The MAPE ignores
+    the rows where the target is 0.
+    """
+    error = prediction_error(target, prediction)
+    nonzero = target != 0
+    relative_error = np.divide(
+        np.abs(error), np.abs(target), out=np.zeros_like(error), where=nonzero
+    )
+    count = np.bincount(codes, minlength=n_groups)
+    nonzero_count = np.bincount(codes, weights=nonzero, minlength=n_groups)
+    sums = {
+        "mae": np.bincount(codes, weights=np.abs(error), minlength=n_groups),
+        "rmse": np.bincount(codes, weights=error**2, minlength=n_groups),
+        "mape": np.bincount(codes, weights=relative_error, minlength=n_groups),
+        "mean_error": np.bincount(codes, weights=error, minlength=n_groups),
+    }
+    with np.errstate(divide="ignore", invalid="ignore"):
+        metrics = {
+            "mae": sums["mae"] / count,
+            "rmse": np.sqrt(sums["rmse"] / count),
+            "mape": 100 * sums["mape"] / nonzero_count,
+            "mean_error": sums["mean_error"] / count,
+        }
+    metrics["count"] = count
+    return metrics
+
+
+def _to_json_value(value):
+    """Convert a numpy scalar to a json serialisable value."""
+    value = value.item()
+    if isinstance(value, float) and np.isnan(value):
+        return None
+    return value
+
+
+def regression_metrics(target, prediction):
+    """MAE, RMSE, MAPE and mean error of the predictions."""
+    codes = np.zeros(len(target), dtype=np.int64)
+    metrics = grouped_metrics(target, prediction, codes, 1)
+    return {name: _to_json_value(value[0]) for name, value in metrics.items()}
+
+
+def _bootstrap_metrics(target, prediction, n_samples, seed, batch_elements):
+    """Metrics of `n_samples` bootstrap resamples of the predictions.
+
+    The samples are drawn in batches of at most `batch_elements` resampled
+    values. Returns an array of shape (n_samples, len(METRICS)).
+    """
+    rng = np.random.default_rng(seed)
+    n_rows = len(target)
+    max_batch_size = max(1, batch_elements // n_rows)
+    error = prediction_error(target, prediction)
+    nonzero = target != 0
+    relative_error = np.divide(
+        np.abs(error), np.abs(target), out=np.zeros_like(error), where=nonzero
+    )
+    results = []
+    for start in range(0, n_samples, max_batch_size):
+        batch_size = min(max_batch_size, n_samples - start)
+        indices = rng.integers(0, n_rows, size=(batch_size, n_rows))
+        sample_error = error[indices]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            mape = (
+                100
+                * relative_error[indices].sum(axis=1)
+                / nonzero[indices].sum(axis=1)
+            )
+        results.append(
+            np.column_stack(
+                [
+                    np.abs(sample_error).mean(axis=1),
+                    np.sqrt((sample_error**2).mean(axis=1)),
+                    mape,
+                    sample_error.mean(axis=1),
+                ]
+            )
+        )
+    return np.concatenate(results)
+
+
+def _confidence_intervals(samples, confidence_level):
+    """Percentile confidence intervals of the bootstrap metrics."""
+    alpha = (1 - confidence_level) / 2
+    low, high = np.nanquantile(samples, [alpha, 1 - alpha], axis=0)
+    return {
+        name: [_to_json_value(low[i]), _to_json_value(high[i])]
+        for i, name in enumerate(METRICS)
+    }
+
+
+def _open_target_prediction(store_path):
+    """Target and prediction of a stored dataset, without missing rows.
+
+    Float columns are the memory maps themselves, columns stored with
+    another dtype and datasets with missing rows are read into a copy.
+    """
+    target = np.asarray(open_column(store_path, "target"), dtype=float)
+    prediction = np.asarray(open_column(store_path, "prediction"), dtype=float)
+    valid = ~(np.isnan(target) | np.isnan(prediction))
+    if valid.all():
+        return target, prediction
+    return target[valid], prediction[valid]
+
+
+def _bootstrap_stored_metrics(store_path, n_samples, seed, batch_elements):
+    """Bootstrap metrics of a stored dataset, see `_bootstrap_metrics`.
+
+    This runs in the worker processes, which open the target and prediction
+    columns from the store instead of receiving a copy of them.
+    """
+    target, prediction = _open_target_prediction(store_path)
+    return _bootstrap_metrics(
+        target, prediction, n_samples, seed, batch_elements
+    )
+
+
+def bootstrap_confidence_intervals(
+    store_path,
+    n_bootstrap=1000,
+    confidence_level=0.95,
+    n_workers=1,
+    seed=None,
+):
+    """Bootstrap confidence intervals of the regression metrics.
+
+    Uses the `target` and `prediction` columns of the dataset stored at
+    `store_path`. The bootstrap samples are split across a process pool of
+    `n_workers`, each worker with its own independent random stream.
+    """
+    n_workers = max(1, min(n_workers, n_bootstrap))
+    sample_counts = [
+        len(chunk)
+        for chunk in np.array_split(np.arange(n_bootstrap), n_workers)
+    ]
+    seeds = np.random.SeedSequence(seed).spawn(n_workers)
+    batch_elements = BOOTSTRAP_BATCH_ELEMENTS // n_workers
+    if n_workers > 1:
+        with ProcessPoolExecutor(max_workers=n_workers) as executor:
+            samples = np.concatenate(
+                list(
+                    executor.map(
+                        _bootstrap_stored_metrics,
+                        repeat(str(store_path)),
+                        sample_counts,
+                        seeds,
+                        repeat(batch_elements),
+                    )
+                )
+            )
+    else:
+        samples = _bootstrap_stored_metrics(
+            store_path, sample_counts[0], seeds[0], batch_elements
+        )
+
+    return _confidence_intervals(samples, confidence_level)
+
+
+def segment_metrics(
+    historical_data: pd.DataFrame, current_data: pd.DataFrame, column
+):
+    """Regression metrics of both datasets per category of a column."""
+    n_reference = len(historical_data)
+    values = pd.concat(
+        [historical_data[column], current_data[column]], ignore_index=True
+    )
+    codes, categories = pd.factorize(values.astype(str))
+    segments = {str(category): {} for category in categories}
+    for dataset, data, dataset_codes in [
+        ("reference", historical_data, codes[:n_reference]),
+        ("current", current_data, codes[n_reference:]),
+    ]:
+        metrics = grouped_metrics(
+            data["target"].to_numpy(dtype=float),
+            data["prediction"].to_numpy(dtype=float),
+            dataset_codes,
+            len(categories),
+        )
+        for i, category in enumerate(categories):
+            segments[str(category)][dataset] = {
+                name: _to_json_value(value[i])
+                for name, value in metrics.items()
+            }
+    return segments
+
+
+def _drop_missing(data: pd.DataFrame):
+    """Drop the rows without target or prediction."""
+    return data.dropna(subset=["target", "prediction"])
+
+
+def compute_regression_quality(
+    historical_data: pd.DataFrame,
+    current_data: pd.DataFrame,
+    segment_columns=None,
+    n_bootstrap=0,
+    confidence_level=0.95,
+    n_workers=1,
+    psi_threshold: float = 0.1,
+    ks_alpha: float = 0.05,
+    n_bins: int = 10,
+    current_store_path=None,
+) -> dict:
+    """Model quality of both datasets and drift of the residuals.
+
+    Expects the `target` and `prediction` columns. The residuals are
+    `prediction - target` and their drift uses the same tests as the drift
+    screening, which already covers the target and the prediction.
+    The confidence intervals are bootstrapped from the current dataset in
+    the dataset store when `current_store_path` is given, split across
+    `n_workers` processes. Otherwise they are bootstrapped in this process.
+    """
+    historical_data = _drop_missing(historical_data)
+    current_data = _drop_missing(current_data)
+    reference = {
+        "target": historical_data["target"].to_numpy(dtype=float),
+        "prediction": historical_data["prediction"].to_numpy(dtype=float),
+    }
+    current = {
+        "target": current_data["target"].to_numpy(dtype=float),
+        "prediction": current_data["prediction"].to_numpy(dtype=float),
+    }
+
+    quality = {
+        "reference": regression_metrics(
+            reference["target"], reference["prediction"]
+        ),
+        "current": regression_metrics(
+            current["target"], current["prediction"]
+        ),
+        "residual_drift": screen_column(
+            prediction_error(reference["target"], reference["prediction"]),
+            prediction_error(current["target"], current["prediction"]),
+            psi_threshold=psi_threshold,
+            ks_alpha=ks_alpha,
+            n_bins=n_bins,
+        ),
+    }
+
+    if n_bootstrap > 0 and len(current["target"]) > 0:
+        if current_store_path is not None:
+            intervals = bootstrap_confidence_intervals(
+                current_store_path,
+                n_bootstrap=n_bootstrap,
+                confidence_level=confidence_level,
+                n_workers=n_workers,
+            )
+        else:
+            if n_workers > 1:
+                logger.warning(
+                    "No dataset store path given, bootstrapping the "
+                    "confidence intervals in a single process"
+                )
+            samples = _bootstrap_metrics(
+                current["target"],
+                current["prediction"],
+                n_bootstrap,
+                np.random.SeedSequence(),
+                BOOTSTRAP_BATCH_ELEMENTS,
+            )
+            intervals = _confidence_intervals(samples, confidence_level)
+        quality["current"]["confidence_intervals"] = intervals
+
+    if segment_columns:
+        quality["segments"] = {
+            column: segment_metrics(historical_data, current_data, column)
+            for column in segment_columns
+        }
+    return quality
+
+
+def save_regression_quality(quality: dict, save_path) -> None:
+    """Save the regression quality result as a json file."""
+    with open(save_path, "w") as quality_file:
+        json.dump(quality, quality_file, indent=2)
+
+
+def generate_regression_quality(
+    historical_data: pd.DataFrame,
+    current_data: pd.DataFrame,
+    config,
+    current_store_path=None,
+) -> dict:
+    """Compute and save the regression quality using the config settings."""
+    quality_config = config["regression_quality"]
+    screening_config = config["drift_screening"]
+    quality = compute_regression_quality(
+        historical_data,
+        current_data,
+        segment_columns=quality_config["segment_columns"],
+        n_bootstrap=quality_config["n_bootstrap"],
+        confidence_level=quality_config["confidence_level"],
+        n_workers=quality_config["n_workers"],
+        psi_threshold=screening_config["psi_threshold"],
+        ks_alpha=screening_config["ks_alpha"],
+        n_bins=screening_config["n_bins"],
+        current_store_path=current_store_path,
+    )
+    save_regression_quality(quality, quality_config["save_path"])
+    return quality
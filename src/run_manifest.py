@@ -0,0 +1,160 @@
+"""Run manifest to skip drift runs whose inputs have not changed."""
+
+import datetime
+import hashlib
+import json
+import os
+import re
+
+from botocore.exceptions import ClientError
+from git import Git, GitCommandError
+
+from src.get_data import get_authenticated_github_url
+from src.utils import logger
+
+MANIFEST_PREFIX = "manifests"
+
+
+def get_data_version_sha(repo_url, data_version):
+    """Resolve a data version tag to its git commit sha without cloning.
+
+    A full commit sha is returned as it is. Returns None if the data version
+    cannot be resolved, in which case the run cannot be fingerprinted.
+    """
+    if re.fullmatch(r"[0-9a-f]{40}", data_version):
+        return data_version
+    tag_ref = f"refs/tags/{data_version}"
+    try:
+        refs = Git().ls_remote(repo_url, tag_ref).splitlines()
+    except GitCommandError as e:
+        logger.warning(
+            f"Data version-{data_version} could not be resolved "
+            f"with error: {e.status}"
+        )
+        return None
+    shas = {}
+    for ref in refs:
+        sha, name = ref.split("\t")
+        shas[name] = sha
+    # Annotated tags are listed twice, the peeled `^{}` ref is the commit
+    sha = shas.get(f"{tag_ref}^{{}}", shas.get(tag_ref))
+    if sha is None:
+        logger.warning(f"Data version-{data_version} is not a data repo tag")
+    return sha
+
+
+def get_config_hash(config):
+    """Hash of the configuration used for the run."""
+    config_json = json.dumps(config, sort_keys=True, default=str)
+    return hashlib.sha256(config_json.encode()).hexdigest()
+
+
+def build_run_manifest(
+    config,
+    data_repo,
+    historical_data_version,
+    new_data_version,
+    model_endpoint,
+    model_version=None,
+    bucket_name=None,
+):
+    """Build the manifest describing all the inputs of a drift run.
+
+    The bucket the results are uploaded to is part of the inputs, so that
+    a run for another bucket is not skipped.
+    The fingerprint is None when a data version or the model version is
+    unknown, as the run could then be skipped although its inputs changed.
+    """
+    repo_url = get_authenticated_github_url(data_repo)
+    inputs = {
+        "data_repo": data_repo,
+        "historical_data_version": historical_data_version,
+        "historical_data_sha": get_data_version_sha(
+            repo_url, historical_data_version
+        ),
+        "new_data_version": new_data_version,
+        "new_data_sha": get_data_version_sha(repo_url, new_data_version),
+        "model_endpoint": model_endpoint,
+        "model_version": model_version,
+        "bucket_name": bucket_name,
+        "feature_columns": config["feature_columns"],
+        "config_hash": get_config_hash(config),
+    }
+    unknown = [
+        name
+        for name in ["historical_data_sha", "new_data_sha", "model_version"]
+        if inputs[name] is None
+    ]
+    if unknown:
+        logger.warning(
+            f"Run cannot be fingerprinted, unknown {', '.join(unknown)}. "
+            "Skipping unchanged runs is disabled."
+        )
+    return {
+        "fingerprint": None if unknown else get_config_hash(inputs),
+        "inputs": inputs,
+    }
+
+
+def get_manifest_object_name(fingerprint):
+    """Object name of the manifest in the s3 bucket."""
+    return f"{MANIFEST_PREFIX}/{fingerprint}.json"
+
+
+def load_local_manifest(manifest_path):
+    """Load the manifest of the last run saved locally, if any."""
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path, "r") as manifest_file:
+        return json.load(manifest_file)
+
+
+def load_remote_manifest(s3_client, bucket_name, fingerprint):
+    """Load the manifest matching the fingerprint from s3, if any."""
+    try:
+        response = s3_client.get_object(
+            Bucket=bucket_name, Key=get_manifest_object_name(fingerprint)
+        )
+    except ClientError as e:
+        if e.response["Error"]["Code"] in ("NoSuchKey", "404"):
+            return None
+        raise e
+    return json.loads(response["Body"].read())
+
+
+def find_previous_run(manifest, manifest_path, s3_client, bucket_name):
+    """Find a previous successful run with the same fingerprint.
+
+    The local manifest is checked first, then the one in the s3 bucket.
+    """
+    fingerprint = manifest["fingerprint"]
+    if fingerprint is None:
+        return None
+    previous = load_local_manifest(manifest_path)
+    if previous is None or previous["fingerprint"] != fingerprint:
+        previous = load_remote_manifest(s3_client, bucket_name, fingerprint)
+    if previous is None or previous.get("status") != "success":
+        return None
+    return previous
+
+
+def save_run_manifest(manifest, manifest_path, s3_client, bucket_name):
+    """Mark the run as successful and save its manifest.
+
+    The manifest is saved locally and, if the run has a fingerprint, next
+    to the reports in the bucket.
+    """
+    manifest["status"] = "success"
+    manifest["completed_at"] = datetime.datetime.now().isoformat(
+        timespec="seconds"
+    )
+    manifest_json = json.dumps(manifest, indent=2)
+    with open(manifest_path, "w") as manifest_file:
+        manifest_file.write(manifest_json)
+    if manifest["fingerprint"] is None:
+        return
+    s3_client.put_object(
+        Bucket=bucket_name,
+        Key=get_manifest_object_name(manifest["fingerprint"]),
+        Body=manifest_json.encode(),
+    )
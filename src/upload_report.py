@@ -7,6 +7,8 @@ from botocore.client import Config
 
 from src.utils import load_yaml_config
 
+TIMESTAMP_FORMAT = "%Y%m%d_%H%M%S"
+
 
 def get_s3_client():
     """Create and return an S3 client."""
@@ -33,11 +35,15 @@ def get_s3_client():
         )
 
 
-def upload(s3_client, file_name, bucket_name):
-    """Upload the report file to the s3 bucket."""
-    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+def upload(s3_client, file_name, bucket_name, object_prefix="report"):
+    """Upload the report file to the s3 bucket.
+
+    Returns the name of the uploaded object.
+    """
+    timestamp = datetime.datetime.now().strftime(TIMESTAMP_FORMAT)
     # Adding the timestamp to the filename when saving it
-    object_name = f"report_{timestamp}.html"
+    extension = Path(file_name).suffix or ".html"
+    object_name = f"{object_prefix}_{timestamp}{extension}"
 
     # Upload the file
     try:
@@ -49,14 +55,48 @@ def upload(s3_client, file_name, bucket_name):
     except Exception as e:
         print(f"Error uploading file: {e}")
         raise e
+    return object_name
+
+
+def get_last_report_time(s3_client, bucket_name):
+    """Get the upload time of the latest full report in the s3 bucket.
+
+    The time is parsed from the `report_{timestamp}.html` object names.
+    Returns None if no report has been uploaded yet.
+    """
+    last_report_time = None
+    paginator = s3_client.get_paginator("list_objects_v2")
+    for page in paginator.paginate(Bucket=bucket_name, Prefix="report_"):
+        for obj in page.get("Contents", []):
+            try:
+                report_time = datetime.datetime.strptime(
+                    obj["Key"], f"report_{TIMESTAMP_FORMAT}.html"
+                )
+            except ValueError:
+                continue
+            if last_report_time is None or report_time > last_report_time:
+                last_report_time = report_time
+    return last_report_time
 
 
 if __name__ == "__main__":
     # load the config file
     config = load_yaml_config()
     report_save_path = Path(config["report_save_path"]).resolve()
+    screening_save_path = Path(
+        config["drift_screening"]["save_path"]
+    ).resolve()
     bucket_name = os.getenv(
         "DRIFT_REPORT_BUCKET", config["report_save_bucket"]
     )
     s3_client = get_s3_client()
-    upload(s3_client, report_save_path, bucket_name)
+    upload(s3_client, screening_save_path, bucket_name, "screening")
+    upload(
+        s3_client,
+        Path(config["regression_quality"]["save_path"]).resolve(),
+        bucket_name,
+        "regression_quality",
+    )
+    # The full report is only generated when the drift screening asks for it
+    if report_save_path.exists():
+        upload(s3_client, report_save_path, bucket_name)
@@ -0,0 +1,59 @@
+"""Unit tests for the memory mapped dataset store."""
+
+import mmap
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.dataset_store import (
+    open_column,
+    read_dataset,
+    write_column,
+    write_dataset,
+)
+
+data = pd.DataFrame(
+    {
+        "area": [7420.0, 8960.0, np.nan],
+        "bedrooms": [4, 3, 2],
+        "furnishingstatus": ["furnished", None, "unfurnished"],
+    }
+)
+
+
+def test_write_and_read_dataset(tmp_path):
+    """Stored dataset is read back as memory mapped columns."""
+    write_dataset(data, tmp_path)
+
+    stored = read_dataset(tmp_path)
+
+    pd.testing.assert_frame_equal(
+        stored.astype({"furnishingstatus": object}),
+        data,
+        check_dtype=False,
+    )
+    assert stored["bedrooms"].dtype == np.int64
+    assert isinstance(stored["furnishingstatus"].dtype, pd.CategoricalDtype)
+    assert isinstance(open_column(tmp_path, "area"), np.memmap)
+
+    # The dataframe is a view of the memory mapped files
+    values = stored["area"].to_numpy()
+    while getattr(values, "base", None) is not None:
+        values = values.base
+    assert isinstance(values, mmap.mmap)
+
+    assert list(read_dataset(tmp_path, ["bedrooms"]).columns) == ["bedrooms"]
+
+
+def test_write_column(tmp_path):
+    """Columns can be added to a stored dataset."""
+    write_dataset(data, tmp_path)
+
+    write_column(tmp_path, "prediction", pd.Series([1.0, 2.0, 3.0]))
+
+    stored = read_dataset(tmp_path)
+    assert stored["prediction"].tolist() == [1.0, 2.0, 3.0]
+
+    with pytest.raises(ValueError):
+        write_column(tmp_path, "prediction", pd.Series([1.0]))
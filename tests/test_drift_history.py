@@ -0,0 +1,194 @@
+"""Unit tests for the drift history."""
+
+import hashlib
+import io
+from unittest.mock import MagicMock
+
+import boto3
+from botocore.exceptions import ClientError
+from botocore.response import StreamingBody
+from botocore.stub import ANY, Stubber
+
+from src.drift_history import (
+    append_to_history,
+    download_history,
+    get_column_trend,
+    get_drift_onset,
+    get_runs,
+    parse_args,
+    record_run,
+)
+
+manifest = {
+    "fingerprint": "abc",
+    "inputs": {
+        "model_endpoint": "http://localhost/invocations",
+        "model_version": "1",
+        "historical_data_version": "data-v1.0.0",
+        "new_data_version": "data-v1.1.0",
+    },
+}
+
+
+def make_screening(timestamp, area_drift):
+    """Screening result with the given drift of the area column."""
+    return {
+        "timestamp": timestamp,
+        "drift_detected": area_drift,
+        "full_report": area_drift,
+        "columns": {
+            "area": {
+                "column_type": "num",
+                "psi": 0.3 if area_drift else 0.01,
+                "ks_statistic": 0.2,
+                "drift_detected": area_drift,
+            },
+            "mainroad": {
+                "column_type": "cat",
+                "psi": 0.02,
+                "ks_statistic": None,
+                "drift_detected": False,
+            },
+        },
+    }
+
+
+def test_drift_history(tmp_path):
+    """Runs are recorded and queried per column and model."""
+    history_path = tmp_path / "drift_history.sqlite"
+    for timestamp, area_drift in [
+        ("2024-01-01T00:00:00", True),
+        ("2024-01-02T00:00:00", False),
+        ("2024-01-03T00:00:00", True),
+        ("2024-01-04T00:00:00", True),
+    ]:
+        record_run(
+            history_path,
+            manifest,
+            make_screening(timestamp, area_drift),
+            {"predict": 1.5},
+        )
+
+    trend = get_column_trend(history_path, "area")
+    assert [row["psi"] for row in trend] == [0.3, 0.01, 0.3, 0.3]
+    assert get_column_trend(history_path, "area", model_version="2") == []
+
+    onset = get_drift_onset(history_path, "area")
+    assert onset["timestamp"] == "2024-01-03T00:00:00"
+    assert get_drift_onset(history_path, "mainroad") is None
+
+    runs = get_runs(history_path, model_version="1")
+    assert [run["n_drifted_columns"] for run in runs] == [1, 0, 1, 1]
+    assert runs[0]["timings"] == '{"predict": 1.5}'
+
+
+def test_download_history_removes_stale_history(tmp_path):
+    """A local history is not kept when the bucket has none."""
+    history_path = tmp_path / "drift_history.sqlite"
+    record_run(history_path, manifest, make_screening("2024-01-01", True))
+    s3_client = MagicMock()
+    s3_client.get_object.side_effect = ClientError(
+        {"Error": {"Code": "NoSuchKey"}}, "GetObject"
+    )
+
+    assert download_history(s3_client, "b", history_path) is None
+    assert not history_path.exists()
+
+
+def test_append_to_history_retries_on_conflict(tmp_path):
+    """Runs recorded concurrently by another run are not overwritten."""
+    history_path = tmp_path / "drift_history.sqlite"
+    remote_path = tmp_path / "remote.sqlite"
+    record_run(remote_path, manifest, make_screening("2024-01-01", True))
+    s3_client = MagicMock()
+
+    def etag():
+        return hashlib.md5(remote_path.read_bytes()).hexdigest()
+
+    s3_client.get_object.side_effect = lambda **kwargs: {
+        "Body": MagicMock(
+            iter_chunks=lambda: iter([remote_path.read_bytes()])
+        ),
+        "ETag": etag(),
+    }
+
+    def put_object(Body, IfMatch=None, **kwargs):
+        # Another run records its results before our first upload
+        if s3_client.put_object.call_count == 1:
+            record_run(
+                remote_path, manifest, make_screening("2024-01-02", False)
+            )
+            raise ClientError(
+                {"Error": {"Code": "PreconditionFailed"}}, "PutObject"
+            )
+        assert IfMatch == etag()
+        remote_path.write_bytes(Body.read())
+
+    s3_client.put_object.side_effect = put_object
+
+    append_to_history(
+        s3_client,
+        "b",
+        history_path,
+        manifest,
+        make_screening("2024-01-03", True),
+    )
+
+    assert s3_client.put_object.call_count == 2
+    timestamps = [run["timestamp"] for run in get_runs(remote_path)]
+    assert timestamps == ["2024-01-01", "2024-01-02", "2024-01-03"]
+
+
+def test_append_to_history_s3_requests(tmp_path):
+    """History requests are valid for the s3 client in use."""
+    history_path = tmp_path / "drift_history.sqlite"
+    remote_path = tmp_path / "remote.sqlite"
+    record_run(remote_path, manifest, make_screening("2024-01-01", True))
+    remote_history = remote_path.read_bytes()
+    s3_client = boto3.client(
+        "s3",
+        region_name="eu-west-2",
+        aws_access_key_id="testing",
+        aws_secret_access_key="testing",
+    )
+    key = {"Bucket": "b", "Key": "drift_history.sqlite"}
+
+    with Stubber(s3_client) as stubber:
+        stubber.add_response(
+            "get_object",
+            {
+                "Body": StreamingBody(
+                    io.BytesIO(remote_history), len(remote_history)
+                ),
+                "ETag": '"etag-1"',
+            },
+            key,
+        )
+        stubber.add_response(
+            "put_object", {}, {**key, "Body": ANY, "IfMatch": '"etag-1"'}
+        )
+        append_to_history(
+            s3_client,
+            "b",
+            history_path,
+            manifest,
+            make_screening("2024-01-02", False),
+        )
+        stubber.assert_no_pending_responses()
+
+    timestamps = [run["timestamp"] for run in get_runs(history_path)]
+    assert timestamps == ["2024-01-01", "2024-01-02"]
+
+
+def test_parse_args():
+    """The model version can be given after the subcommands."""
+    args = parse_args(["trend", "area", "--model-version", "1"])
+    assert (args.command, args.column, args.model_version) == (
+        "trend",
+        "area",
+        "1",
+    )
+
+    args = parse_args(["--sync", "runs", "--model-version", "2"])
+    assert args.sync and args.model_version == "2"
+    assert parse_args(["onset", "area"]).model_version is None
@@ -0,0 +1,121 @@
+"""Unit tests for the drift screening."""
+
+import datetime
+
+import numpy as np
+import pandas as pd
+
+from src.dataset_store import load_meta, write_dataset
+from src.drift_screening import (
+    get_full_report_reason,
+    screen_drift,
+    screen_stored_drift,
+)
+
+rng = np.random.default_rng(42)
+historical_data = pd.DataFrame(
+    {
+        "area": rng.normal(5000, 1000, 500),
+        "furnishingstatus": rng.choice(
+            ["furnished", "semi-furnished", "unfurnished"], 500
+        ),
+    }
+)
+
+
+def test_screen_drift_no_drift():
+    """Same distribution should not be flagged as drifted."""
+    screening = screen_drift(historical_data, historical_data.copy())
+
+    assert not screening["drift_detected"]
+    assert screening["drifted_columns"] == []
+    assert screening["columns"]["area"]["column_type"] == "num"
+    assert screening["columns"]["furnishingstatus"]["column_type"] == "cat"
+    assert screening["columns"]["area"]["psi"] == 0
+    assert screening["columns"]["furnishingstatus"]["ks_statistic"] is None
+
+
+def test_screen_drift_detects_drift():
+    """Shifted numerical and categorical columns should be flagged."""
+    current_data = pd.DataFrame(
+        {
+            "area": rng.normal(8000, 1000, 500),
+            "furnishingstatus": ["furnished"] * 450 + ["unfurnished"] * 50,
+        }
+    )
+
+    screening = screen_drift(historical_data, current_data)
+
+    assert screening["drift_detected"]
+    assert screening["drifted_columns"] == ["area", "furnishingstatus"]
+    assert screening["columns"]["area"]["ks_statistic"] > 0.5
+
+
+def test_get_full_report_reason():
+    """Full report is generated on drift or when a periodic one is due."""
+    now = datetime.datetime.now()
+    no_drift = {"drift_detected": False}
+
+    assert (
+        get_full_report_reason({"drift_detected": True}, now, 7)
+        == "drift_detected"
+    )
+    assert get_full_report_reason(no_drift, now, 7) is None
+    assert get_full_report_reason(no_drift, None, None) is None
+    assert get_full_report_reason(no_drift, None, 7) == "no_previous_report"
+    assert (
+        get_full_report_reason(no_drift, now - datetime.timedelta(days=8), 7)
+        == "periodic"
+    )
+
+
+def test_screen_stored_drift_parallel(tmp_path):
+    """Screening of the stores across processes matches the in memory one."""
+    current_data = historical_data.assign(area=historical_data["area"] + 500)
+    write_dataset(historical_data, tmp_path / "historical")
+    write_dataset(current_data, tmp_path / "new")
+
+    screening = screen_drift(historical_data, current_data)
+    parallel_screening = screen_stored_drift(
+        tmp_path / "historical", tmp_path / "new", n_workers=2
+    )
+
+    assert parallel_screening["columns"] == screening["columns"]
+    assert parallel_screening["drifted_columns"] == ["area"]
+
+
+def test_screen_stored_drift_different_categories(tmp_path):
+    """Stored category codes are matched across the two datasets."""
+    current_data = pd.DataFrame(
+        {
+            "area": historical_data["area"],
+            "furnishingstatus": ["unfurnished"] * 450 + [None] * 50,
+        }
+    )
+    write_dataset(historical_data, tmp_path / "historical")
+    write_dataset(current_data, tmp_path / "new")
+
+    screening = screen_drift(historical_data, current_data)
+    stored_screening = screen_stored_drift(
+        tmp_path / "historical", tmp_path / "new"
+    )
+
+    assert stored_screening["columns"] == screening["columns"]
+    assert stored_screening["drifted_columns"] == ["furnishingstatus"]
+
+
+def test_screen_stored_drift_loads_meta_once(tmp_path, monkeypatch):
+    """The store metadata is not parsed again for every column."""
+    write_dataset(historical_data, tmp_path / "historical")
+    write_dataset(historical_data, tmp_path / "new")
+    loaded = []
+
+    def recording_load_meta(store_path):
+        loaded.append(store_path)
+        return load_meta(store_path)
+
+    monkeypatch.setattr("src.drift_screening.load_meta", recording_load_meta)
+
+    screen_stored_drift(tmp_path / "historical", tmp_path / "new")
+
+    assert loaded == [tmp_path / "historical", tmp_path / "new"]
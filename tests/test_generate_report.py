@@ -1,10 +1,13 @@
 """Unit tests for evidently report generation."""
 
+import datetime
+import json
 import os
 
 import pandas as pd
 
-from src.drift_report import generate_report
+from src.dataset_store import write_dataset
+from src.drift_report import generate_gated_report, generate_report
 
 
 def test_generate_report():
@@ -41,3 +44,57 @@ def test_generate_report():
         # Clean up: Remove the file after the test
         if os.path.exists(report_name):
             os.remove(report_name)
+
+
+def test_generate_gated_report_skips_without_drift(tmp_path):
+    """Full report is skipped when screening finds no drift"""
+    data = pd.DataFrame(
+        {
+            "feature1": [1, 2, 3, 4, 5, 6],
+            "target": [10, 20, 30, 40, 50, 60],
+            "prediction": [11, 22, 33, 44, 55, 66],
+        }
+    )
+    report_path = tmp_path / "report.html"
+    screening_path = tmp_path / "screening.json"
+    config = {
+        "drift_screening": {
+            "enabled": True,
+            "psi_threshold": 0.1,
+            "ks_alpha": 0.05,
+            "n_bins": 10,
+            "n_workers": 1,
+            "full_report_interval_days": 7,
+            "save_path": screening_path,
+        }
+    }
+
+    screening = generate_gated_report(
+        data, data.copy(), report_path, config, datetime.datetime.now()
+    )
+
+    assert not screening["full_report"]
+    assert not report_path.exists()
+    assert json.loads(screening_path.read_text())["full_report"] is False
+
+    # Periodic full report is due
+    screening = generate_gated_report(data, data.copy(), report_path, config)
+
+    assert screening["full_report_reason"] == "no_previous_report"
+    assert report_path.exists()
+
+    # Screening workers reading the dataset store
+    write_dataset(data, tmp_path / "historical")
+    write_dataset(data, tmp_path / "new")
+    config["drift_screening"]["n_workers"] = 2
+    stored_screening = generate_gated_report(
+        data,
+        data.copy(),
+        report_path,
+        config,
+        datetime.datetime.now(),
+        store_paths=(tmp_path / "historical", tmp_path / "new"),
+    )
+
+    assert stored_screening["columns"] == screening["columns"]
+    assert not stored_screening["full_report"]
@@ -7,7 +7,8 @@ import pandas as pd
 import pytest
 import requests
 
-from src.inference import predict, prepare_single_record_payload
+from src.dataset_store import open_column, write_dataset
+from src.inference import load_data, predict, prepare_single_record_payload
 
 # define dummy endpoint, sample test data, and expected output
 model_endpoint = "http://localhost/v2/models/house_price_prediction_prod/infer"
@@ -125,3 +126,17 @@ def test_predict_http_error():
     with pytest.raises(requests.exceptions.RequestException):
         # a request that will definitely fail (the endpoint doesn't exist)
         predict(model_endpoint, sample_data)
+
+
+def test_load_data_float_target(tmp_path):
+    """Integer prices are loaded and stored as a float target."""
+    data_path = tmp_path / "data.csv"
+    sample_data.assign(price=[4000000, 3000000]).to_csv(data_path, index=False)
+
+    historical_data, current_data = load_data(
+        data_path, data_path, {"label_column": "price"}
+    )
+    write_dataset(current_data, tmp_path / "store")
+
+    assert historical_data["target"].dtype == np.float64
+    assert open_column(tmp_path / "store", "target").dtype == np.float64
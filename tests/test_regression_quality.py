@@ -0,0 +1,120 @@
+"""Unit tests for the regression quality metrics."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.dataset_store import write_dataset
+from src.regression_quality import (
+    bootstrap_confidence_intervals,
+    compute_regression_quality,
+    regression_metrics,
+)
+
+historical_data = pd.DataFrame(
+    {
+        "furnishingstatus": ["furnished", "unfurnished"] * 3,
+        "target": [100.0, 200.0, 300.0, 400.0, 500.0, 600.0],
+        "prediction": [110.0, 190.0, 330.0, 360.0, 500.0, 600.0],
+    }
+)
+
+
+def test_regression_metrics():
+    """Metrics match their definitions."""
+    target = np.array([100.0, 200.0, 0.0])
+    prediction = np.array([110.0, 180.0, 30.0])
+
+    metrics = regression_metrics(target, prediction)
+
+    assert metrics["count"] == 3
+    assert metrics["mae"] == pytest.approx(20)
+    assert metrics["rmse"] == pytest.approx(np.sqrt((100 + 400 + 900) / 3))
+    assert metrics["mape"] == pytest.approx(10)
+    assert metrics["mean_error"] == pytest.approx(20 / 3)
+
+
+def test_compute_regression_quality(tmp_path):
+    """Quality per dataset and segment with the output drift."""
+    current_data = historical_data.assign(
+        prediction=historical_data["prediction"] * 2
+    )
+    write_dataset(current_data, tmp_path)
+
+    quality = compute_regression_quality(
+        historical_data,
+        current_data,
+        segment_columns=["furnishingstatus"],
+        n_bootstrap=50,
+        current_store_path=tmp_path,
+    )
+
+    assert quality["current"]["mae"] > quality["reference"]["mae"]
+    assert quality["residual_drift"]["drift_detected"]
+    assert "drift" not in quality
+    assert set(quality["current"]["confidence_intervals"]) == {
+        "mae",
+        "rmse",
+        "mape",
+        "mean_error",
+    }
+    furnished = quality["segments"]["furnishingstatus"]["furnished"]
+    assert furnished["reference"]["count"] == 3
+    assert furnished["reference"]["mae"] == pytest.approx(40 / 3)
+
+    # Without the dataset store, bootstrapped from the dataframes
+    in_memory_quality = compute_regression_quality(
+        historical_data, current_data, n_bootstrap=50
+    )
+    low, high = in_memory_quality["current"]["confidence_intervals"]["mae"]
+    assert low <= quality["current"]["mae"] <= high
+
+
+def test_bootstrap_confidence_intervals_parallel(tmp_path):
+    """Bootstrap split across processes gives sensible intervals."""
+    rng = np.random.default_rng(0)
+    target = rng.normal(1000, 100, 200)
+    prediction = target + rng.normal(0, 10, 200)
+    write_dataset(
+        pd.DataFrame({"target": target, "prediction": prediction}), tmp_path
+    )
+    mae = regression_metrics(target, prediction)["mae"]
+
+    intervals = bootstrap_confidence_intervals(
+        tmp_path, n_bootstrap=200, n_workers=2, seed=0
+    )
+
+    low, high = intervals["mae"]
+    assert low < mae < high
+    assert intervals == bootstrap_confidence_intervals(
+        tmp_path, n_bootstrap=200, n_workers=2, seed=0
+    )
+
+
+def test_bootstrap_batches_are_bounded(monkeypatch, tmp_path):
+    """Bootstrap batches hold a bounded number of resampled values."""
+    monkeypatch.setattr(
+        "src.regression_quality.BOOTSTRAP_BATCH_ELEMENTS", 1000
+    )
+    rng = np.random.default_rng(0)
+    target = rng.normal(1000, 100, 400)
+    prediction = target + rng.normal(0, 10, 400)
+    write_dataset(
+        pd.DataFrame({"target": target, "prediction": prediction}), tmp_path
+    )
+    sizes = []
+    default_rng = np.random.default_rng
+
+    class RecordingGenerator:
+        def __init__(self, seed):
+            self._rng = default_rng(seed)
+
+        def integers(self, low, high, size):
+            sizes.append(size)
+            return self._rng.integers(low, high, size=size)
+
+    monkeypatch.setattr(np.random, "default_rng", RecordingGenerator)
+
+    bootstrap_confidence_intervals(tmp_path, n_bootstrap=10)
+
+    assert sizes == [(2, 400)] * 5
@@ -0,0 +1,145 @@
+"""Unit tests for the run manifest."""
+
+import json
+from unittest.mock import MagicMock, patch
+
+from botocore.exceptions import ClientError
+from git import GitCommandError
+
+from src.run_manifest import (
+    build_run_manifest,
+    find_previous_run,
+    get_data_version_sha,
+    save_run_manifest,
+)
+
+config = {
+    "feature_columns": ["area", "bedrooms"],
+    "dvc": {"git_repo_url": "https://github.com/user/repo"},
+}
+
+
+@patch("src.run_manifest.Git")
+def test_get_data_version_sha(mock_git):
+    """Annotated tags resolve to the peeled commit sha."""
+    mock_git.return_value.ls_remote.return_value = (
+        "aaa\trefs/tags/data-v1.0.0\nbbb\trefs/tags/data-v1.0.0^{}"
+    )
+    assert get_data_version_sha("url", "data-v1.0.0") == "bbb"
+    mock_git.return_value.ls_remote.assert_called_with(
+        "url", "refs/tags/data-v1.0.0"
+    )
+
+    mock_git.return_value.ls_remote.return_value = "ccc\trefs/tags/data-v1.1.0"
+    assert get_data_version_sha("url", "data-v1.1.0") == "ccc"
+
+
+@patch("src.run_manifest.Git")
+def test_get_data_version_sha_unresolved(mock_git):
+    """Versions that are not tags are returned as None, not raised."""
+    # Only the exact tag ref is used, not other refs matching the pattern
+    mock_git.return_value.ls_remote.return_value = (
+        "aaa\trefs/tags/nested/refs/tags/data-v1.0.0"
+    )
+    assert get_data_version_sha("url", "data-v1.0.0") is None
+
+    mock_git.return_value.ls_remote.side_effect = GitCommandError(
+        "ls-remote", 128
+    )
+    assert get_data_version_sha("url", "data-v1.0.0") is None
+
+    # Commit shas identify themselves and need no lookup
+    sha = "0123456789abcdef0123456789abcdef01234567"
+    assert get_data_version_sha("url", sha) == sha
+
+
+@patch("src.run_manifest.get_authenticated_github_url")
+@patch("src.run_manifest.get_data_version_sha")
+def test_build_run_manifest(mock_get_sha, mock_get_url):
+    """Fingerprint changes with any of the run inputs."""
+    mock_get_sha.side_effect = lambda url, version: f"sha-{version}"
+    args = (config, "repo", "data-v1.0.0", "data-v1.1.0", "endpoint")
+
+    manifest = build_run_manifest(*args, model_version="1")
+
+    assert manifest["inputs"]["new_data_sha"] == "sha-data-v1.1.0"
+    assert (
+        manifest["fingerprint"]
+        == build_run_manifest(*args, model_version="1")["fingerprint"]
+    )
+    assert (
+        manifest["fingerprint"]
+        != build_run_manifest(*args, model_version="2")["fingerprint"]
+    )
+
+
+@patch("src.run_manifest.get_authenticated_github_url")
+@patch("src.run_manifest.get_data_version_sha")
+def test_build_run_manifest_unknown_inputs(mock_get_sha, mock_get_url):
+    """Runs with an unknown model or data version are never skipped."""
+    s3_client = MagicMock()
+    args = (config, "repo", "data-v1.0.0", "data-v1.1.0", "endpoint")
+
+    mock_get_sha.return_value = "sha"
+    manifest = build_run_manifest(*args)
+    assert manifest["fingerprint"] is None
+    assert find_previous_run(manifest, "unused", s3_client, "b") is None
+
+    mock_get_sha.return_value = None
+    manifest = build_run_manifest(*args, model_version="1")
+    assert manifest["fingerprint"] is None
+
+    s3_client.get_object.assert_not_called()
+
+
+def test_find_previous_run(tmp_path):
+    """Previous run is found locally first, then in the bucket."""
+    manifest_path = tmp_path / "run_manifest.json"
+    manifest = {"fingerprint": "abc", "inputs": {}}
+    s3_client = MagicMock()
+    s3_client.get_object.side_effect = ClientError(
+        {"Error": {"Code": "NoSuchKey"}}, "GetObject"
+    )
+
+    assert find_previous_run(manifest, manifest_path, s3_client, "b") is None
+
+    save_run_manifest(dict(manifest), manifest_path, s3_client, "b")
+    s3_client.put_object.assert_called_once()
+    assert s3_client.put_object.call_args.kwargs["Key"] == "manifests/abc.json"
+
+    previous = find_previous_run(manifest, manifest_path, s3_client, "b")
+    assert previous["status"] == "success"
+
+    # A different local manifest falls back to the bucket
+    remote = json.loads(manifest_path.read_text())
+    manifest_path.write_text(json.dumps({"fingerprint": "other"}))
+    s3_client.get_object.side_effect = None
+    s3_client.get_object.return_value = {
+        "Body": MagicMock(read=lambda: json.dumps(remote).encode())
+    }
+    previous = find_previous_run(manifest, manifest_path, s3_client, "b")
+    assert previous["completed_at"] == remote["completed_at"]
+
+
+@patch("src.run_manifest.get_authenticated_github_url")
+@patch("src.run_manifest.get_data_version_sha")
+def test_find_previous_run_other_bucket(mock_get_sha, mock_get_url, tmp_path):
+    """A run for another bucket is not skipped by the local manifest."""
+    mock_get_sha.return_value = "sha"
+    manifest_path = tmp_path / "run_manifest.json"
+    args = (config, "repo", "data-v1.0.0", "data-v1.1.0", "endpoint", "1")
+    s3_client = MagicMock()
+    s3_client.get_object.side_effect = ClientError(
+        {"Error": {"Code": "NoSuchKey"}}, "GetObject"
+    )
+    save_run_manifest(
+        build_run_manifest(*args, bucket_name="old"),
+        manifest_path,
+        s3_client,
+        "old",
+    )
+
+    manifest = build_run_manifest(*args, bucket_name="new")
+
+    assert find_previous_run(manifest, manifest_path, s3_client, "new") is None
+    s3_client.get_object.assert_called_once()